@@ -53,22 +53,22 @@ def main(argv: list[str] | None = None) -> int:
         verbose=args.verbose,
     )
 
+    # Print each result as soon as its download finishes, then a summary.
+    # Return an appropriate exit code for CI.
+    ok = total = 0
     try:
-        results = mgr.download_many(args.URL)
+        for r in mgr.iter_download(args.URL):
+            total += 1
+            if r.ok:
+                ok += 1
+                print(f"OK  {r.url} -> {r.path}")   # OK  https://a.com/file.jpg -> downloads/file.jpg
+            else:
+                print(f"ERR {r.url} (status={r.status}, attempts={r.attempts}) {r.error}")
+                # ERR https://b.com/file.jpg (status=503, attempts=4) HTTPError 503: Service Unavailable
     finally:
         # Always close the thread pool
         mgr.close()
 
-    # Print a simple summary and return an appropriate exit code for CI
-    ok = 0
-    for r in results:
-        if r.ok:
-            ok += 1
-            print(f"OK  {r.url} -> {r.path}")   # OK  https://a.com/file.jpg -> downloads/file.jpg
-        else:
-            print(f"ERR {r.url} (status={r.status}, attempts={r.attempts}) {r.error}")
-            # ERR https://b.com/file.jpg (status=503, attempts=4) HTTPError 503: Service Unavailable
-    total = len(results)
     print(f"\nSummary: {ok}/{total} succeeded")
     return 0 if ok == total else 1
 
@@ -1,17 +1,31 @@
 from __future__ import annotations
+import errno
+import os
+import select
+import sys
 import time
 import random
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    import fcntl  # Unix only; used to enlarge the splice pipe
+except ImportError:
+    fcntl = None
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Optional, List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 # ThreadPoolExecutor runs downloads in parallel
-# as_completed() → yields results as soon as each finishes, not in order
+# wait(FIRST_COMPLETED) → returns as soon as any submitted download finishes
 
-# We use Python's standard library HTTP client:
-from urllib.request import Request, urlopen
+# We use Python's standard library HTTP client. http.client lets us keep
+# connections open and reuse them across URLs on the same host.
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urljoin, urlsplit
+from urllib.request import ProxyHandler, Request, build_opener, getproxies, proxy_bypass
 from urllib.error import URLError, HTTPError
 
 # HTTPError → server responded with error code
@@ -23,6 +37,35 @@ from .utils import guess_filename, dedupe_path
 # These HTTP status codes are considered temporary problems worth retrying.
 RETRIABLE_STATUS = {429, 500, 502, 503, 504}
 
+# Redirects we follow to the new Location, as urlopen() did for us.
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 10
+
+# Limits on idle keep-alive connections kept for reuse. When a limit is hit the
+# connection that has been idle longest is closed, so a scrape across many
+# hosts doesn't pile up open sockets (and run into the open-file limit).
+MAX_IDLE_PER_HOST = 8
+MAX_IDLE_TOTAL = 32
+
+# Size of the userspace buffer in front of each output file. Short reads (e.g.
+# small pieces of a chunked-encoding body) are gathered here and flushed with
+# one write() per 1 MiB, instead of one write() syscall per piece.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# How many bytes we pull from the socket per read. 1 MiB keeps the number of
+# Python-level loop iterations and read/write syscalls per file low; large
+# sequential writes are also what disks handle best.
+CHUNK_SIZE = 1024 * 1024
+
+# Zero-copy receive: os.splice() (Linux, Python 3.10+) moves body bytes from the
+# socket to the output file inside the kernel, via a pipe, without copying them
+# into Python. Used for plain-HTTP bodies of known length at least this big.
+_HAVE_SPLICE = hasattr(os, "splice") and fcntl is not None
+SPLICE_MIN_SIZE = 64 * 1024
+# splice() errors meaning "not supported for these fds" (socket type, filesystem,
+# seccomp sandbox) rather than a real I/O failure.
+_SPLICE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EOPNOTSUPP}
+
 # @dataclass autogenrates: __init__, __repr__, and equality helpers.
 @dataclass
 class Result:
@@ -35,6 +78,10 @@ class Result:
     - attempts:  how many times we tried
     - error:     final error message (if failed)
     """
+    # Fixed attribute layout, no per-instance __dict__. Spelled out by hand because
+    # @dataclass(slots=True) needs Python 3.10 and we support 3.9.
+    __slots__ = ("url", "ok", "path", "status", "attempts", "error")
+
     url: str
     ok: bool
     path: Optional[Path]
@@ -42,6 +89,61 @@ class Result:
     attempts: int
     error: Optional[str]
 
+class ResultBatch:
+    """
+    All results of one download_many() call, stored column-wise ("struct of arrays").
+
+    Instead of one Result object per URL, each field lives in its own column:
+    - urls, paths, errors: plain lists
+    - ok, status, attempts: compact `array` columns (a few bytes per row, no per-row object)
+    A status of 0 in the column means "unknown" (None on the Result).
+
+    It still behaves like the old List[Result]: len(), indexing, slicing and
+    iteration build Result objects on demand, so `for r in batch` keeps working.
+    """
+    __slots__ = ("urls", "ok", "status", "attempts", "paths", "errors")
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self.ok = array("B")        # 1 = success, 0 = failure
+        self.status = array("H")    # HTTP status code, 0 = unknown
+        self.attempts = array("I")
+        self.paths: List[Optional[Path]] = []
+        self.errors: List[Optional[str]] = []
+
+    def append(self, r: Result) -> None:
+        """Add one Result as a new row."""
+        self.urls.append(r.url)
+        self.ok.append(r.ok)
+        self.status.append(r.status or 0)
+        self.attempts.append(r.attempts)
+        self.paths.append(r.path)
+        self.errors.append(r.error)
+
+    def succeeded(self) -> int:
+        """How many downloads succeeded (sums the ok column in C)."""
+        return sum(self.ok)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            # Like a list: a slice gives a list of Results
+            return [self[j] for j in range(*i.indices(len(self.urls)))]
+        return Result(
+            url=self.urls[i],
+            ok=bool(self.ok[i]),
+            path=self.paths[i],
+            status=self.status[i] or None,
+            attempts=self.attempts[i],
+            error=self.errors[i],
+        )
+
+    def __iter__(self) -> Iterator[Result]:
+        for i in range(len(self.urls)):
+            yield self[i]
+
 class DownloadManager:
     """
     Coordinates multiple downloads in parallel while:
@@ -77,13 +179,37 @@ class DownloadManager:
         # One limiter shared by all threads enforces requests/sec
         self._limiter = RateLimiter(rate=rate, capacity=max(rate, 1.0))
         # Thread pool controls parallelism, max is 4 (concurrency)
+        self.concurrency = concurrency
         self._pool = ThreadPoolExecutor(max_workers=concurrency)
         # Ensure logs from multiple threads don't interleave
         self._print_lock = threading.Lock()
+        # Idle keep-alive connections, keyed by (scheme, host, port). A worker takes one
+        # out while it uses it and puts it back afterwards, so no two threads share one.
+        self._conn_pool: Dict[Tuple[str, str, int], List[HTTPConnection]] = {}
+        # The same idle connections in the order they were returned (oldest first),
+        # used to pick which one to close when MAX_IDLE_TOTAL is reached.
+        self._idle_order: "OrderedDict[HTTPConnection, Tuple[str, str, int]]" = OrderedDict()
+        self._conn_lock = threading.Lock()
+        self._headers = {"User-Agent": self.user_agent}
+        # http_proxy / https_proxy / no_proxy from the environment, read once. Proxied
+        # requests, and schemes other than http/https (file:, data:, ftp:), go through
+        # a plain urllib opener built from the same settings.
+        self._proxies = getproxies()
+        self._opener = build_opener(ProxyHandler(self._proxies))
+        # Per-thread scratch state (e.g. the reusable read buffer), so workers never share it
+        self._tls = threading.local()
+        # Turned off for this manager the first time splice() turns out not to be supported
+        self._splice_enabled = _HAVE_SPLICE
 
     def close(self):
-        """Shut down the thread pool gracefully (Waits for all downloads)."""
+        """Shut down the thread pool gracefully (Waits for all downloads), then drop idle connections."""
         self._pool.shutdown(wait=True)
+        with self._conn_lock:
+            idle = list(self._idle_order)
+            self._conn_pool.clear()
+            self._idle_order.clear()
+        for conn in idle:
+            conn.close()
 
     def _log(self, msg: str):
         """Print only if verbose mode is on, and serialize prints across threads."""
@@ -91,20 +217,224 @@ class DownloadManager:
             with self._print_lock:
                 print(msg, flush=True)
 
+    def _checkout(self, key: Tuple[str, str, int]) -> Tuple[HTTPConnection, bool]:
+        """
+        Take an idle connection for `key` from the pool, or open a new one.
+        Returns (connection, reused) so callers know whether it may have gone stale.
+        """
+        with self._conn_lock:
+            idle = self._conn_pool.get(key)
+            if idle:
+                conn = idle.pop()
+                if not idle:
+                    del self._conn_pool[key]
+                del self._idle_order[conn]
+                return conn, True
+        scheme, host, port = key
+        cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _checkin(self, key: Optional[Tuple[str, str, int]], conn: HTTPConnection, resp) -> None:
+        """
+        Return a connection to the pool if the server allows keep-alive, else close it.
+        If that takes the pool over MAX_IDLE_PER_HOST or MAX_IDLE_TOTAL, the longest-idle
+        connection (for this host, or overall) is closed instead.
+        """
+        if key is None or resp.will_close or not resp.isclosed():
+            conn.close()
+            return
+        evicted = []
+        with self._conn_lock:
+            idle = self._conn_pool.setdefault(key, [])
+            if len(idle) >= MAX_IDLE_PER_HOST:
+                oldest = idle.pop(0)
+                del self._idle_order[oldest]
+                evicted.append(oldest)
+            idle.append(conn)
+            self._idle_order[conn] = key
+            while len(self._idle_order) > MAX_IDLE_TOTAL:
+                oldest, oldest_key = self._idle_order.popitem(last=False)
+                conns = self._conn_pool[oldest_key]
+                conns.remove(oldest)
+                if not conns:
+                    del self._conn_pool[oldest_key]
+                evicted.append(oldest)
+        # Close outside the lock; closing a socket can take a moment.
+        for c in evicted:
+            c.close()
+
+    def _request(self, key: Tuple[str, str, int], target: str):
+        """
+        Send one GET over a pooled connection and return (connection, response).
+        Socket-level failures are raised as URLError, like urlopen() does.
+        """
+        while True:
+            conn, reused = self._checkout(key)
+            try:
+                conn.request("GET", target, headers=self._headers)
+                return conn, conn.getresponse()
+            except (ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused:
+                    # The server dropped an idle keep-alive connection; try a fresh one.
+                    continue
+                raise URLError(e) from e
+            except OSError as e:
+                conn.close()
+                raise URLError(e) from e
+            except BaseException:
+                conn.close()
+                raise
+
+    def _open(self, url: str):
+        """
+        GET `url`, following redirects. Returns (connection, response, pool key).
+        Raises HTTPError on any status >= 300 that isn't a followed redirect, like urlopen().
+
+        URLs that aren't http/https (file:, data:, ftp:, ...) and URLs with a proxy
+        configured for their scheme go through a urllib opener instead, exactly as
+        urlopen() handled them. Those responses are not pooled: the "connection"
+        returned is the response itself and the key is None.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if (parts.scheme not in ("http", "https") or not parts.hostname
+                    or (self._proxies.get(parts.scheme) and not proxy_bypass(parts.hostname))):
+                resp = self._opener.open(Request(url, headers=self._headers), timeout=self.timeout)
+                return resp, resp, None
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            # Interned so pool lookups for the same host compare by identity
+            key = (sys.intern(parts.scheme), sys.intern(parts.hostname), port)
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+
+            conn, resp = self._request(key, target)
+            location = resp.getheader("Location")
+            if resp.status in REDIRECT_STATUS and location:
+                # We don't need the redirect body; dropping the connection is cheaper than draining it.
+                conn.close()
+                url = urljoin(url, location)
+                continue
+            if resp.status >= 300:
+                # 4xx/5xx, and 3xx we don't follow (300, 304, redirect without Location)
+                conn.close()
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            return conn, resp, key
+
+        conn.close()
+        raise HTTPError(url, resp.status, f"more than {MAX_REDIRECTS} redirects", resp.headers, None)
+
+    def _chunk_buffer(self):
+        """
+        Return this thread's reusable read buffer and a memoryview over it.
+        Allocated on first use, then kept for every later URL the thread handles,
+        so the pool holds at most `concurrency` buffers.
+        """
+        tls = self._tls
+        buf = getattr(tls, "buf", None)
+        if buf is None:
+            buf = tls.buf = bytearray(CHUNK_SIZE)
+            tls.view = memoryview(buf)
+        return buf, tls.view
+
+    def _splice_body(self, conn: HTTPConnection, resp, f) -> None:
+        """
+        Copy the response body straight from the socket into `f` with os.splice()
+        (socket -> pipe -> file), so the bytes never pass through Python.
+
+        Only for plain HTTP on our own (non-proxied) connections, with a
+        Content-Length and no Content-Encoding; TLS, chunked and compressed
+        bodies need Python to decode them. Keeps
+        resp.length up to date, so resp.readinto() can carry on from wherever
+        this stops (end of body, early EOF, or a socket/filesystem that refuses
+        splice, after which splicing stays off for this manager).
+        """
+        if (not self._splice_enabled or type(conn) is not HTTPConnection or resp.chunked
+                or resp.length is None or resp.length < SPLICE_MIN_SIZE
+                or resp.getheader("Content-Encoding", "identity") != "identity"):
+            return
+
+        # http.client has already buffered the first part of the body while reading
+        # the headers; write that out normally before splicing from the socket.
+        head = resp.fp.read1(min(resp.length, CHUNK_SIZE))
+        if not head:
+            return
+        f.write(head)
+        f.flush()
+        resp.length -= len(head)
+
+        sock_fd, out_fd = resp.fp.fileno(), f.fileno()
+        # poll() rather than select(): select() can't handle fd numbers >= 1024,
+        # which a busy connection pool can easily reach.
+        poller = select.poll()
+        poller.register(sock_fd, select.POLLIN)
+        poll_ms = None if self.timeout is None else self.timeout * 1000
+        pipe_r, pipe_w = os.pipe()
+        try:
+            # A pipe holds 64 KiB by default, which caps each splice(); ask for a
+            # CHUNK_SIZE pipe (allowed for unprivileged users up to pipe-max-size).
+            try:
+                fcntl.fcntl(pipe_w, fcntl.F_SETPIPE_SZ, CHUNK_SIZE)
+            except OSError:
+                pass
+            moved = False
+            while resp.length:
+                try:
+                    n = os.splice(sock_fd, pipe_w, min(resp.length, CHUNK_SIZE), flags=os.SPLICE_F_MOVE)
+                except BlockingIOError:
+                    # Sockets with a timeout are non-blocking underneath; wait for data ourselves.
+                    if not poller.poll(poll_ms):
+                        raise TimeoutError("timed out")
+                    continue
+                except OSError as e:
+                    if moved or e.errno not in _SPLICE_UNSUPPORTED:
+                        raise
+                    # Splicing from this socket isn't supported here. Nothing has been
+                    # taken off the socket yet, so readinto() can simply do the work.
+                    self._splice_enabled = False
+                    return
+                moved = True
+                if not n:
+                    return  # peer closed early; readinto() sees the same EOF
+                resp.length -= n
+                while n:
+                    try:
+                        n -= os.splice(pipe_r, out_fd, n, flags=os.SPLICE_F_MOVE)
+                    except OSError as e:
+                        if e.errno not in _SPLICE_UNSUPPORTED:
+                            raise
+                        # The output filesystem doesn't support splice: write out what
+                        # is already in the pipe normally and let readinto() do the rest.
+                        self._splice_enabled = False
+                        f.write(os.read(pipe_r, n))
+                        return
+        finally:
+            os.close(pipe_r)
+            os.close(pipe_w)
+
+    def _rng(self) -> random.Random:
+        """This thread's own random generator for backoff jitter (created on first use)."""
+        rng = getattr(self._tls, "rng", None)
+        if rng is None:
+            rng = self._tls.rng = random.Random()
+        return rng
+
     def _sleep_backoff(self, attempt: int, retry_after: Optional[float]):
         """
         Wait before retrying:
           - If server told us Retry-After: X, we sleep X seconds.
-          - Else we use exponential backoff with jitter:
-              delay = base * 2^(attempt-1) + small_random
+          - Else we use exponential backoff with "full jitter":
+              delay = random(0, min(base * 2^(attempt-1), cap))
+            Spreading retries over the whole window (not just +25%) keeps many
+            workers retrying the same failing server from arriving in lockstep.
         """
         if retry_after is not None:
             delay = float(retry_after)
         else:
             base = 0.5  # start with half a second
-            delay = base * (2 ** (attempt - 1))  # 0.5, 1, 2, 4, ...
-            delay += random.uniform(0, 0.25 * delay)  # jitter prevents thundering herd
-            delay = min(delay, 10.0)  # cap so we don't wait forever
+            window = min(base * (2 ** (attempt - 1)), 10.0)  # 0.5, 1, 2, 4, ... capped at 10s
+            delay = self._rng().uniform(0, window)
         self._log(f"waiting {delay:.2f}s before retry")
         time.sleep(delay)
 
@@ -121,50 +451,67 @@ class DownloadManager:
         last_err = None
         last_status = None
 
-        while attempts <= self.retries:
+        # Settings never change during a download, so read them into locals once
+        # instead of looking them up on self for every attempt and every chunk.
+        retries = self.retries
+        verbose = self.verbose
+        acquire = self._limiter.acquire
+        output_dir = self.output_dir
+        no_clobber = self.no_clobber
+        buf, view = self._chunk_buffer()
+
+        while attempts <= retries:
             attempts += 1
             # Ensure we don't exceed the global requests/sec, This may block until a token is available.
-            self._limiter.acquire()
+            acquire()
 
             try:
-                headers = {"User-Agent": self.user_agent}
-                # Build a GET request; we pass headers like User-Agent
-                req = Request(url, headers=headers, method="GET")
-
-                self._log(f"GET {url}")
-                # urlopen will raise HTTPError on 4xx/5xx (except some 200-range cases)
+                if verbose:
+                    self._log(f"GET {url}")
+                # Raises HTTPError on 4xx/5xx and URLError on network failures.
                 # `timeout` applies to the socket operations.
-                with urlopen(req, timeout=self.timeout) as resp:
-                    # Some Python versions expose status on resp; otherwise assume 200
-                    status = getattr(resp, "status", 200)
+                conn, resp, key = self._open(url)
+                try:
+                    status = resp.status
                     last_status = status
 
-                    # Convert response headers to a plain dict for easier access
-                    hdrs: Dict[str, str] = {k: v for k, v in resp.headers.items()}
-
-                    # Choose a safe filename
-                    fname = guess_filename(url, hdrs)
-                    out_path = self.output_dir / fname
-                    if self.no_clobber:
+                    # Choose a safe filename. resp.headers is an email.message.Message,
+                    # which already supports case-insensitive .get(), so no copy is needed.
+                    fname = guess_filename(url, resp.headers)
+                    out_path = output_dir / fname
+                    if no_clobber:
                         out_path = dedupe_path(out_path)
 
                     # Stream the response in chunks to avoid loading big files into memory.
-                    with open(out_path, "wb") as f:
+                    # readinto() fills this thread's buffer in place instead of allocating
+                    # a new bytes object per chunk.
+                    with open(out_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+                        # Moves what it can socket -> file in the kernel; the loop below
+                        # then finishes whatever is left (nothing, in the common case).
+                        self._splice_body(conn, resp, f)
+                        readinto, write = resp.readinto, f.write
                         while True:
-                            chunk = resp.read(64 * 1024)  # 64 KB
-                            if not chunk:
+                            n = readinto(buf)
+                            if not n:
                                 break
-                            f.write(chunk)
-
-                    # Success!
-                    return Result(
-                        url=url,
-                        ok=True,
-                        path=out_path,
-                        status=status,
-                        attempts=attempts,
-                        error=None,
-                    )
+                            write(view[:n])
+                except BaseException:
+                    # A half-read response leaves the connection unusable.
+                    conn.close()
+                    raise
+
+                # Body fully read: the connection can serve the next URL on this host.
+                self._checkin(key, conn, resp)
+
+                # Success!
+                return Result(
+                    url=url,
+                    ok=True,
+                    path=out_path,
+                    status=status,
+                    attempts=attempts,
+                    error=None,
+                )
 
             except HTTPError as e:
                 # HTTPError includes a status code and headers (e.g., Retry-After)
@@ -177,8 +524,8 @@ class DownloadManager:
                 except Exception:
                     retry_after = None
 
-                if e.code in RETRIABLE_STATUS and attempts <= self.retries:
-                    self._log(f"HTTP {e.code} on {url}; retrying ({attempts}/{self.retries})")
+                if e.code in RETRIABLE_STATUS and attempts <= retries:
+                    self._log(f"HTTP {e.code} on {url}; retrying ({attempts}/{retries})")
                     self._sleep_backoff(attempts, retry_after)
                     continue
 
@@ -188,8 +535,8 @@ class DownloadManager:
             except URLError as e:
                 # Network-level error (DNS, connection, TLS, etc.)
                 last_err = f"URLError: {e.reason}"
-                if attempts <= self.retries:
-                    self._log(f"URLError on {url}; retrying ({attempts}/{self.retries})")
+                if attempts <= retries:
+                    self._log(f"URLError on {url}; retrying ({attempts}/{retries})")
                     self._sleep_backoff(attempts, None)
                     continue
                 break
@@ -197,8 +544,8 @@ class DownloadManager:
             except Exception as e:
                 # Catch-all to avoid crashing the whole program on a rare error.
                 last_err = f"{type(e).__name__}: {e}"
-                if attempts <= self.retries:
-                    self._log(f"Error on {url}; retrying ({attempts}/{self.retries})")
+                if attempts <= retries:
+                    self._log(f"Error on {url}; retrying ({attempts}/{retries})")
                     self._sleep_backoff(attempts, None)
                     continue
                 break
@@ -213,26 +560,47 @@ class DownloadManager:
             error=last_err,
         )
 
-    def download_many(self, urls: Iterable[str]) -> List[Result]:
+    def iter_download(self, urls: Iterable[str]) -> Iterator[Result]:
         """
         Input: many URLs (list, tuple, generator — anything iterable)
-        Output: list of Result objects
+        Output: yields one Result per URL as each download finishes
 
-        Download many URLs in parallel using a thread pool.
-        We submit a future per URL, then collect results as they complete.
+        Only `concurrency * 2` downloads are submitted to the thread pool at a
+        time; each time some finish, that many more URLs are pulled from `urls`.
+        Memory stays bounded however many URLs there are, and `urls` may be a
+        lazy generator (e.g. lines streamed from a file).
 
         future is like a recipt that python provides,
           when work is submitted to a thread pool
         """
-        futures = [self._pool.submit(self._download_one, u) for u in urls]
-        # One thread per URL (up to concurrency), Returns Future objects immediately (submit())
-        results: List[Result] = []
+        it = iter(urls)
+        submit = self._pool.submit
+        window = self.concurrency * 2
+        inflight = {submit(self._download_one, u) for u in islice(it, window)}
+        try:
+            while inflight:
+                # Wake up as soon as any download finishes (Order depends on completion time, NOT submission order)
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                # Refill the window before handing results back, so the pool stays busy
+                for u in islice(it, len(done)):
+                    inflight.add(submit(self._download_one, u))
+                for fut in done:
+                    yield fut.result()
+                    # If something went wrong → raises the exception from the thread
+        finally:
+            # If the caller stops early, don't start downloads nobody will collect.
+            for fut in inflight:
+                fut.cancel()
+
+    def download_many(self, urls: Iterable[str]) -> ResultBatch:
+        """
+        Input: many URLs (list, tuple, generator — anything iterable)
+        Output: a ResultBatch (iterate it to get Result objects)
 
-        # Key idea: Results arrive as soon as each finishes (Yields each Future the moment it finishes)
-        # Faster downloads don’t wait for slower ones (Order depends on completion time, NOT submission order)
-        for fut in as_completed(futures):
-            results.append(fut.result())
-            # If the download is already done → returns immediately
-            # If something went wrong → raises the exception from the thread
+        Download many URLs in parallel using a thread pool and collect every
+        result. See iter_download() to handle results one by one instead.
+        """
+        results = ResultBatch()
+        for r in self.iter_download(urls):
+            results.append(r)
         return results
-        
\ No newline at end of file
@@ -2,6 +2,13 @@ from __future__ import annotations
 import time
 import threading
 
+# One whole token expressed in nano-tokens.
+_NANO = 10**9
+
+# With adaptive=True, waits shorter than this are spun out instead of sleeping
+# on the Condition (a timed futex wait costs more than the wait itself).
+SPIN_THRESHOLD_NS = 50_000  # 50 µs
+
 class RateLimiter:
     """
     A simple, thread-safe **token-bucket** rate limiter.
@@ -39,7 +46,7 @@ class RateLimiter:
             download_file(url)
     """
 
-    def __init__(self, rate: float, capacity: float | None = None):
+    def __init__(self, rate: float, capacity: float | None = None, adaptive: bool = False):
         if rate <= 0:
             raise ValueError("rate must be > 0 (tokens per second)")
         self.rate = float(rate)
@@ -47,9 +54,17 @@ class RateLimiter:
         # If capacity is not given, use 'rate' so we can burst up to one second worth of tokens
         self.capacity = float(capacity if capacity is not None else rate)
         
+        # Internally everything is integer arithmetic on "nano-tokens" (1 token = 10**9)
+        # against time.monotonic_ns(), so refills never accumulate float rounding error.
+        self._rate_ns = max(1, round(self.rate * _NANO))  # nano-tokens added per second
+        self._capacity_ns = round(self.capacity * _NANO)  # bucket size in nano-tokens
+
         # Start with a full bucket (burst allowed immediately)
-        self._tokens = self.capacity
-        self._last = time.perf_counter()    # (tracks time) stores current high-resolution time
+        self._tokens_ns = self._capacity_ns
+        self._last_ns = time.monotonic_ns()    # (tracks time) stores current monotonic time in ns
+
+        # adaptive: busy-wait for very short deficits (only matters at thousands of tokens/sec)
+        self._adaptive = adaptive
 
         # Condition variable = Lock + wait/notify
         # Multiply threads will call acquire() concurrently.
@@ -58,14 +73,14 @@ class RateLimiter:
 
     def _refill(self) -> None:
         """Refill tokens based on how much time has passed since last check."""
-        now = time.perf_counter()
-        elapsed = now - self._last
+        now = time.monotonic_ns()
+        elapsed = now - self._last_ns
         if elapsed <= 0:
             return
 
-        self._last = now
+        self._last_ns = now
         # Add tokens proportional to elapsed time, but cap at capacity
-        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._tokens_ns = min(self._capacity_ns, self._tokens_ns + elapsed * self._rate_ns // _NANO)
 
     def acquire(self) -> None:
         """
@@ -79,13 +94,21 @@ class RateLimiter:
         with self._lock: 
             while True:
                 self._refill()
-                if self._tokens >= 1.0:
-                    self._tokens -= 1.0
+                if self._tokens_ns >= _NANO:
+                    self._tokens_ns -= _NANO
                     return
                 # If not enough tokens, wait a small amount until tokens likely exist.
-                deficit = 1.0 - self._tokens
+                deficit = _NANO - self._tokens_ns
+                if self._adaptive:
+                    wait_ns = -(-deficit * _NANO // self._rate_ns)  # ceiling division
+                    if wait_ns < SPIN_THRESHOLD_NS:
+                        # Too short to be worth sleeping: spin until the token is due.
+                        deadline = time.monotonic_ns() + wait_ns
+                        while time.monotonic_ns() < deadline:
+                            pass
+                        continue
                 # If you need 0.4 tokens and you refill at 5 tokens/s, ~0.08s
-                wait_s = max(deficit / self.rate, 0.001)  # at least 1ms to avoid busy-waiting
+                wait_s = max(deficit / self._rate_ns, 0.001)  # at least 1ms to avoid busy-waiting
                 self._lock.wait(timeout=wait_s)
 
     def try_acquire(self) -> bool:
@@ -95,7 +118,7 @@ class RateLimiter:
         """
         with self._lock:
             self._refill()
-            if self._tokens >= 1.0:
-                self._tokens -= 1.0
+            if self._tokens_ns >= _NANO:
+                self._tokens_ns -= _NANO
                 return True
             return False
\ No newline at end of file
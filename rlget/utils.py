@@ -5,17 +5,28 @@ from urllib.parse import urlparse, unquote
 from pathlib import Path
 from typing import Mapping, Optional
 
+# Prefer Google's RE2 (linear-time, no backtracking) when it happens to be
+# installed; rlget itself stays stdlib-only, so fall back to `re` otherwise.
+try:
+    import re2 as _re_engine
+except ImportError:
+    _re_engine = re
+
 # This regex tries to extract a filename from a Content-Disposition header.
 # It supports patterns like:
 #   Content-Disposition: attachment; filename="report.pdf" - Classic format
 #   Content-Disposition: attachment; filename*=UTF-8''photo%20(1).jpg - RFC 5987 format
 #
 # We capture either the RFC 5987 filename* form or the regular filename= form.
-_filename_re = re.compile(
-    r"filename\*=.*''([^;]+)|filename=\"?([^\";]+)\"?",
-    re.IGNORECASE
+# The inline (?i) flag means case-insensitive and is understood by both engines.
+_filename_re = _re_engine.compile(
+    r"(?i)filename\*=.*''([^;]+)|filename=\"?([^\";]+)\"?"
 )
 
+# Translation table for sanitize_filename(): characters Windows forbids become
+# "_", and line breaks become spaces. Built once so each call is a single pass.
+_SANITIZE_TABLE = str.maketrans({**{c: "_" for c in '\\/:*?"<>|'}, "\n": " ", "\r": " "})
+
 def guess_filename(url: str, headers: Optional[Mapping[str, str]] = None, default: str = "download") -> str:
     """
     Decide what to name the file we download.
@@ -28,6 +39,18 @@ def guess_filename(url: str, headers: Optional[Mapping[str, str]] = None, defaul
     if headers:
         cd = headers.get('Content-Disposition') or headers.get('content-disposition')
         if cd:
+            # Fast path for the common `attachment; filename="x"` form: plain substring
+            # searches instead of the regex. Only taken when there is no '*' (so no
+            # filename*=, in any case) and this is the header's only '=' (so no earlier
+            # filename=/FILENAME= the regex would pick first). Anything else (extra
+            # parameters, unquoted, a ';' inside the quotes) falls through to the regex.
+            start = cd.find('filename="') + 10
+            if start >= 10 and "*" not in cd and cd.count("=") == 1:
+                end = cd.find('"', start)
+                candidate = cd[start:end]
+                if end > start and ";" not in candidate:
+                    return sanitize_filename(unquote(candidate))
+
             m = _filename_re.search(cd)
             if m:
                 # group(1) is from filename*, group(2) is from filename=
@@ -54,24 +77,27 @@ def sanitize_filename(name: str) -> str:
     - On Windows, characters like \ / : * ? " < > | are not allowed.
     - We'll replace them with underscore.
     """
-    name = name.strip().replace("\n", " ").replace("\r", " ")
-    name = re.sub(r'[\\/:*?"<>|]', "_", name)
+    name = name.strip().translate(_SANITIZE_TABLE)
     return name or "download" # If everything got stripped → return "download".
 
 def dedupe_path(path: Path) -> Path:
     """
     If 'path' already exists, append (1), (2), ... to avoid overwriting.
     Example:
-      if "photo.jpg" exists, we try "photo(1).jpg", then "photo(2).jpg", etc.
+      if "photo.jpg" exists, and so do "photo(1).jpg" and "photo(2).jpg", we return "photo(3).jpg".
+    Usually "photo(1).jpg" is free and one extra stat() settles it; only when it
+    is taken do we list the directory once instead of stat()-ing candidates one by one.
     """
     if not path.exists():
         return path
     stem, suffix, parent = path.stem, path.suffix, path.parent
     # parent = directory containing the file, eg: downloads
     # photo.jpg, stem → photo, suffix → .jpg
-    i = 1
-    while True:
-        candidate = parent / f"{stem}({i}){suffix}" # → Path("downloads/photo(1).jpg")
-        if not candidate.exists(): # Stops as soon as it finds a free name.
-            return candidate
-        i += 1
\ No newline at end of file
+    first = parent / f"{stem}(1){suffix}"
+    if not first.exists():
+        return first
+    pat = re.compile(re.escape(stem) + r"\((\d+)\)" + re.escape(suffix))
+    with os.scandir(parent) as entries:
+        used = [int(m.group(1)) for e in entries if (m := pat.fullmatch(e.name))]
+    # One past the highest suffix in use is always free → Path("downloads/photo(3).jpg")
+    return parent / f"{stem}({max(used, default=0) + 1}){suffix}"
@@ -1,9 +1,12 @@
+import errno
+import os
+import stat
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
 
-from rlget.downloader import DownloadManager
+from rlget.downloader import DownloadManager, MAX_IDLE_TOTAL, Result, ResultBatch
 
 class TestHandler(BaseHTTPRequestHandler):
     """
@@ -49,16 +52,59 @@ class TestHandler(BaseHTTPRequestHandler):
         # Silence default server logging to keep test output clean
         return
 
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 server with Content-Length on every response, so clients may reuse connections.
+    Endpoints:
+      /data/<name> -> returns 4 KB of data
+      /big         -> returns 3 MB of data (large enough for the zero-copy path)
+      /redirect    -> 302 to /data/moved.bin
+      /notmodified -> 304 with no body
+      http://proxied.invalid/... -> absolute-form request, i.e. we are acting as a proxy
+    `connections` counts accepted TCP connections.
+    """
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    body = bytes(range(256)) * 16
+    big_body = bytes(range(256)) * (3 * 4096)
+
+    def setup(self):
+        KeepAliveHandler.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        if self.path.startswith("/data/") or self.path == "/big" or self.path.startswith("http://proxied.invalid/"):
+            body = self.big_body if self.path == "/big" else self.body
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/notmodified":
+            self.send_response(304)
+            self.end_headers()
+        elif self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/data/moved.bin")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        return
+
 def run_server(server):
     server.serve_forever()
 
-def with_server(fn):
+def with_server(fn, handler=TestHandler):
     """
     Decorator to start/stop a temporary HTTP server for each test.
     We pick port 0 (OS chooses a free port), and pass host/port to the test.
     """
     def wrapper(tmp_path: Path):
-        server = HTTPServer(("127.0.0.1", 0), TestHandler)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
         host, port = server.server_address
         t = threading.Thread(target=run_server, args=(server,), daemon=True)
         t.start()
@@ -66,8 +112,12 @@ def with_server(fn):
             fn(tmp_path, host, port)
         finally:
             server.shutdown()
+            server.server_close()
     return wrapper
 
+def with_keepalive_server(fn):
+    return with_server(fn, handler=KeepAliveHandler)
+
 @with_server
 def test_download_ok(tmp_path: Path, host: str, port: int):
     mgr = DownloadManager(output_dir=tmp_path, rate=10, concurrency=2, retries=0, timeout=5)
@@ -75,6 +125,7 @@ def test_download_ok(tmp_path: Path, host: str, port: int):
         url = f"http://{host}:{port}/ok"
         [res] = mgr.download_many([url])
         assert res.ok and res.path.exists()
+        assert res.path.read_bytes() == b"hello world" * 100
     finally:
         mgr.close()
 
@@ -103,4 +154,185 @@ def test_rate_limiting(tmp_path: Path, host: str, port: int):
         # 6 requests at 2 req/s ~ 3 seconds (allow tolerance)
         assert elapsed >= 2.0
     finally:
-        mgr.close()
\ No newline at end of file
+        mgr.close()
+
+@with_keepalive_server
+def test_connection_reused_across_urls(tmp_path: Path, host: str, port: int):
+    KeepAliveHandler.connections = 0
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        urls = [f"http://{host}:{port}/data/{i}.bin" for i in range(5)]
+        results = mgr.download_many(urls)
+        assert all(r.ok for r in results)
+        assert all(r.path.read_bytes() == KeepAliveHandler.body for r in results)
+        # One worker, one host: every request should ride the same connection.
+        assert KeepAliveHandler.connections == 1
+    finally:
+        mgr.close()
+
+@with_keepalive_server
+def test_redirect_followed(tmp_path: Path, host: str, port: int):
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        [res] = mgr.download_many([f"http://{host}:{port}/redirect"])
+        assert res.ok and res.status == 200
+        assert res.path.read_bytes() == KeepAliveHandler.body
+    finally:
+        mgr.close()
+
+@with_keepalive_server
+def test_result_batch_columns(tmp_path: Path, host: str, port: int):
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        batch = mgr.download_many([f"http://{host}:{port}/missing"])
+        assert len(batch) == 1 and batch.succeeded() == 0
+        [res] = batch
+        assert not res.ok and res.status == 404 and res.attempts == 1 and res.path is None
+        assert res.error.startswith("HTTPError 404")
+    finally:
+        mgr.close()
+
+@with_keepalive_server
+def test_large_body_intact_and_connection_reused(tmp_path: Path, host: str, port: int):
+    KeepAliveHandler.connections = 0
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5, no_clobber=True)
+    try:
+        results = mgr.download_many([f"http://{host}:{port}/big"] * 2)
+        assert all(r.ok for r in results)
+        assert all(r.path.read_bytes() == KeepAliveHandler.big_body for r in results)
+        assert KeepAliveHandler.connections == 1
+    finally:
+        mgr.close()
+
+@with_keepalive_server
+def test_iter_download_pulls_urls_lazily(tmp_path: Path, host: str, port: int):
+    pulled = []
+    def urls():
+        for i in range(10):
+            pulled.append(i)
+            yield f"http://{host}:{port}/data/{i}.bin"
+
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        stream = mgr.iter_download(urls())
+        first = next(stream)
+        # Only a small window (concurrency * 2, plus refills) is read ahead of completed downloads.
+        assert first.ok and len(pulled) <= 4
+        assert sum(r.ok for r in stream) == 9
+    finally:
+        mgr.close()
+
+def test_idle_pool_bounded_across_many_hosts(tmp_path: Path):
+    # 40 servers on 40 ports = 40 distinct (scheme, host, port) pool keys.
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler) for _ in range(40)]
+    for server in servers:
+        # Short poll interval so shutting down 40 servers doesn't take 40 * 0.5s.
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    mgr = DownloadManager(output_dir=tmp_path, rate=1000, concurrency=4, retries=0, timeout=5, no_clobber=True)
+    try:
+        urls = [f"http://127.0.0.1:{s.server_address[1]}/data/x.bin" for s in servers]
+        assert mgr.download_many(urls).succeeded() == 40
+        pooled = sum(len(conns) for conns in mgr._conn_pool.values())
+        assert pooled == MAX_IDLE_TOTAL
+    finally:
+        mgr.close()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+@with_keepalive_server
+def test_unfollowed_3xx_is_an_error(tmp_path: Path, host: str, port: int):
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        [res] = mgr.download_many([f"http://{host}:{port}/notmodified"])
+        assert not res.ok and res.status == 304 and res.path is None
+    finally:
+        mgr.close()
+
+@with_keepalive_server
+def test_http_proxy_from_environment(tmp_path: Path, host: str, port: int):
+    # The test server doubles as the proxy; the target host doesn't exist, so this
+    # only succeeds if the request really goes through http_proxy.
+    saved = {k: os.environ.pop(k, None) for k in ("http_proxy", "HTTP_PROXY", "no_proxy", "NO_PROXY")}
+    os.environ["http_proxy"] = f"http://{host}:{port}"
+    try:
+        mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    finally:
+        for k, v in saved.items():
+            os.environ.pop(k, None)
+            if v is not None:
+                os.environ[k] = v
+    try:
+        [res] = mgr.download_many(["http://proxied.invalid/file.bin"])
+        assert res.ok and res.path.read_bytes() == KeepAliveHandler.body
+    finally:
+        mgr.close()
+
+def test_result_batch_slicing():
+    batch = ResultBatch()
+    for i in range(4):
+        batch.append(Result(url=f"u{i}", ok=i % 2 == 0, path=None, status=200 + i, attempts=1, error=None))
+    assert batch[1:3] == [batch[1], batch[2]]
+    assert [r.url for r in batch[::-1]] == ["u3", "u2", "u1", "u0"]
+    assert batch[-1].status == 203 and batch[0].ok is True
+
+def test_non_http_schemes_still_supported(tmp_path: Path):
+    src = tmp_path / "src" / "local.txt"
+    src.parent.mkdir()
+    src.write_bytes(b"from disk")
+    mgr = DownloadManager(output_dir=tmp_path / "out", rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        [res] = mgr.download_many([src.as_uri()])
+        assert res.ok and res.path.name == "local.txt"
+        assert res.path.read_bytes() == b"from disk"
+        [res] = mgr.download_many(["data:,hello"])
+        assert res.ok and res.path.read_bytes() == b"hello"
+    finally:
+        mgr.close()
+
+def _failing_splice(calls, fail_when):
+    """Wrap os.splice: record (src, dst) per call, raise `fail_when(src, dst)` errno if truthy."""
+    real = os.splice
+    def fake(src, dst, count, *args, **kwargs):
+        calls.append((src, dst))
+        err = fail_when(src, dst)
+        if err:
+            raise OSError(err, os.strerror(err))
+        return real(src, dst, count, *args, **kwargs)
+    return real, fake
+
+@with_keepalive_server
+def test_splice_to_file_einval_falls_back_without_losing_bytes(tmp_path: Path, host: str, port: int):
+    if not hasattr(os, "splice"):
+        return
+    calls = []
+    # The socket -> pipe splice works; pipe -> regular file fails like an unsupported filesystem.
+    real, fake = _failing_splice(calls, lambda src, dst: errno.EINVAL if stat.S_ISREG(os.fstat(dst).st_mode) else 0)
+    os.splice = fake
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5)
+    try:
+        [res] = mgr.download_many([f"http://{host}:{port}/big"])
+        assert res.ok and res.attempts == 1
+        assert res.path.read_bytes() == KeepAliveHandler.big_body
+        assert len(calls) == 2  # one socket -> pipe, one failed pipe -> file
+    finally:
+        os.splice = real
+        mgr.close()
+
+@with_keepalive_server
+def test_splice_unsupported_on_socket_turns_splicing_off(tmp_path: Path, host: str, port: int):
+    if not hasattr(os, "splice"):
+        return
+    calls = []
+    real, fake = _failing_splice(calls, lambda src, dst: errno.EPERM if stat.S_ISSOCK(os.fstat(src).st_mode) else 0)
+    os.splice = fake
+    mgr = DownloadManager(output_dir=tmp_path, rate=100, concurrency=1, retries=0, timeout=5, no_clobber=True)
+    try:
+        results = mgr.download_many([f"http://{host}:{port}/big"] * 2)
+        assert all(r.ok and r.attempts == 1 for r in results)
+        assert all(r.path.read_bytes() == KeepAliveHandler.big_body for r in results)
+        # Tried once, then left off for the second download.
+        assert len(calls) == 1
+    finally:
+        os.splice = real
+        mgr.close()
@@ -12,4 +12,19 @@ def test_rate_limiter_basic_throughput():
 
     elapsed = time.perf_counter() - start
     # Expect at least ~1 second of pacing (we allow tolerance for timing variance).
-    assert elapsed >= 1.0
\ No newline at end of file
+    assert elapsed >= 1.0
+
+def test_try_acquire_drains_burst_then_refuses():
+    # Capacity 3 allows exactly 3 immediate tokens; at 0.5 tokens/sec the 4th must wait.
+    rl = RateLimiter(rate=0.5, capacity=3)
+    assert [rl.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+def test_adaptive_limiter_still_paces_high_rates():
+    # At 50k tokens/sec every wait is ~20 µs, so the adaptive limiter spins instead of sleeping.
+    rl = RateLimiter(rate=50_000, capacity=1, adaptive=True)
+    start = time.perf_counter()
+    for _ in range(1000):
+        rl.acquire()
+    elapsed = time.perf_counter() - start
+    # 999 paced tokens at 50k/s = ~20 ms minimum.
+    assert elapsed >= 0.019
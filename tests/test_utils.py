@@ -6,12 +6,44 @@ def test_guess_filename_from_headers():
     headers = {"Content-Disposition": 'attachment; filename="report.pdf"'}
     assert guess_filename(url, headers) == "report.pdf"
 
+def test_guess_filename_rfc5987_case_insensitive():
+    url = "https://example.com/download"
+    headers = {"Content-Disposition": "attachment; FILENAME*=UTF-8''photo%20(1).jpg"}
+    assert guess_filename(url, headers) == "photo (1).jpg"
+
+def test_guess_filename_mixed_case_rfc5987_wins_over_quoted():
+    url = "https://example.com/download"
+    headers = {"Content-Disposition": "attachment; FILENAME*=UTF-8''b.txt; filename=\"a.txt\""}
+    assert guess_filename(url, headers) == "b.txt"
+
+def test_guess_filename_first_filename_param_wins():
+    url = "https://example.com/download"
+    for cd in ('attachment; filename=plain.txt; filename="quoted.txt"',
+               'attachment; FILENAME=plain.txt; filename="quoted.txt"'):
+        assert guess_filename(url, {"Content-Disposition": cd}) == "plain.txt"
+
 def test_guess_filename_from_url():
     url = "https://example.com/files/image.png"
     assert guess_filename(url, {}) == "image.png"
 
+def test_sanitize_filename():
+    assert sanitize_filename(' a/b:c*d?"e"<f>|g\nh ') == "a_b_c_d__e__f__g h"
+    assert sanitize_filename("   ") == "download"
+
 def test_dedupe_path(tmp_path: Path):
     p = tmp_path / "file.txt"
     p.write_text("a")
     p2 = dedupe_path(p)
-    assert p2.name.startswith("file(") and p2.suffix == ".txt"
\ No newline at end of file
+    assert p2.name.startswith("file(") and p2.suffix == ".txt"
+
+def test_dedupe_path_first_suffix_without_scanning(tmp_path: Path, monkeypatch):
+    (tmp_path / "file.txt").write_text("a")
+    def no_scan(*args):
+        raise AssertionError("directory should not be listed when file(1) is free")
+    monkeypatch.setattr("rlget.utils.os.scandir", no_scan)
+    assert dedupe_path(tmp_path / "file.txt") == tmp_path / "file(1).txt"
+
+def test_dedupe_path_skips_existing_suffixes(tmp_path: Path):
+    for name in ("file.txt", "file(1).txt", "file(2).txt", "other(7).txt"):
+        (tmp_path / name).write_text("a")
+    assert dedupe_path(tmp_path / "file.txt") == tmp_path / "file(3).txt"